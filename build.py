@@ -0,0 +1,32 @@
+"""
+Compile squec's hot pure-Python modules in place with mypyc.
+
+This is not part of the package build, so wheels stay plain Python. mypyc
+compiles against the installed mypy, so run it from an environment that has
+mypy and setuptools installed, in a source checkout:
+
+    python build.py
+
+The compiled extensions are written next to their sources, where they are
+imported instead of the .py files. Delete them to go back to plain Python.
+
+"""
+
+# Modules to compile. They must not import squec's other modules, or any
+# third-party package that mypyc can't see the types of:
+MYPYC_MODULES = ["squec/_vector.py"]
+
+
+def build() -> None:
+    from mypyc.build import mypycify
+    from setuptools import setup
+
+    setup(
+        name="squec",
+        ext_modules=mypycify(["--follow-imports=silent", *MYPYC_MODULES]),
+        script_args=["build_ext", "--inplace"],
+    )
+
+
+if __name__ == "__main__":
+    build()
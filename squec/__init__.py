@@ -1,11 +1,124 @@
+from typing import Sequence
+
 import networkx as nx
+import numpy as np
+
+from . import _fastpath
+from .surface import (
+    VectorIJ,
+    Surface,
+    QubitType,
+    AncillaType,
+    _NODE_DATA,
+)
+from .pmss import partial_min_spanning_set, _solve_pairing
+
+__all__ = [
+    "VectorIJ",
+    "Surface",
+    "QubitType",
+    "AncillaType",
+    "partial_min_spanning_set",
+    "get_optimal_pairing",
+    "get_metagraph",
+    "squec_solve",
+]
+
+# Maps each search source to its row of weighted distances, as returned by
+# Surface.shortest_path_lengths:
+_PathCache = dict[VectorIJ, np.ndarray]
+
+
+def _shortest_paths_from(state: Surface, sources: list[VectorIJ]) -> _PathCache:
+    """
+    Run one shortest-path search from each source over the whole surface.
+
+    The result can be shared by every lookup that starts or ends at one of the
+    sources, instead of running a fresh search per pair of vertices.
+
+    """
+    return dict(zip(sources, state.shortest_path_lengths(sources)))
+
+
+def _cached_path(
+    state: Surface, paths: _PathCache, source: VectorIJ, target: VectorIJ
+) -> list[VectorIJ]:
+    """
+    Reconstruct the shortest path from source to target from the cache.
+
+    At least one of the two endpoints must have been a search source. The path
+    is walked back from the far end along edges that are tight for the
+    source's distances. Among equally short paths, DQ-to-DQ steps are
+    preferred (so diagonal hops through AQs are taken near the lower
+    endpoint), then steps that end nearest to the source. This keeps the
+    chosen path independent of which endpoint is given first and of which
+    shortest-path backend filled the cache.
 
-from .surface import VectorIJ, Surface, QubitType, AncillaType
-from .pmss import partial_min_spanning_set
+    """
+    reverse = source not in paths or (
+        target in paths and (target.i, target.j) < (source.i, source.j)
+    )
+    if reverse:
+        source, target = target, source
+    dist = paths[source]
+    arrays = state.get_arrays()
+    k, k_source = state.node_index(target), state.node_index(source)
+    source_i, source_j = arrays.coords_i[k_source], arrays.coords_j[k_source]
+    path = [k]
+    while k != k_source:
+        start, stop = arrays.indptr[k], arrays.indptr[k + 1]
+        neighbors = arrays.indices[start:stop]
+        tight = neighbors[dist[neighbors] + arrays.weights[start:stop] == dist[k]]
+        # np.lexsort is stable and sorts by its last key first:
+        k = tight[
+            np.lexsort(
+                (
+                    (arrays.coords_i[tight] - source_i) ** 2
+                    + (arrays.coords_j[tight] - source_j) ** 2,
+                    arrays.node_type[tight] != _NODE_DATA,
+                )
+            )[0]
+        ]
+        path.append(k)
+    if not reverse:
+        path.reverse()
+    return [state.node_at(k) for k in path]
+
+
+def _metagraph_dq_counts(
+    state: Surface, vertex_set: Sequence[VectorIJ]
+) -> tuple[list[list[int]], list[int], list[int], list[int]]:
+    """
+    Get the DQ counts between the given AQs, and from each AQ to its ground.
+
+    Returns the pairwise DQ counts, then each AQ's ground DQ i coordinate, j
+    coordinate and DQ count. These are the weights of the metagraph's edges.
+
+    """
+    for ancilla in vertex_set:
+        if state.get_ancilla_type(ancilla) != AncillaType.X:
+            raise NotImplementedError("Y ancillae not yet supported.")
+
+    min_ij = state.minimum_data_qbit_coordinate
+    max_ij = state.maximum_data_qbit_coordinate
+
+    # The grid arithmetic runs over all AQs at once:
+    ai = np.array([a.i for a in vertex_set], dtype=np.int64)
+    aj = np.array([a.j for a in vertex_set], dtype=np.int64)
+    ground_i, ground_j, ground_counts = (
+        values.tolist()
+        for values in _fastpath.ground_dq_counts(ai, aj, min_ij.i, min_ij.j, max_ij.j)
+    )
+    return (
+        _fastpath.pairwise_dq_counts(ai, aj).tolist(),
+        ground_i,
+        ground_j,
+        ground_counts,
+    )
 
 
 def get_optimal_pairing(
-    state: Surface, vertex_set: list[VectorIJ] | None = None
+    state: Surface, vertex_set: Sequence[VectorIJ] | None = None
 ) -> list[tuple[VectorIJ, VectorIJ]]:
     """
     Given a set of AQs, construct an optimal pairing of nearest neighbors.
@@ -24,26 +137,38 @@ def get_optimal_pairing(
 
     If no vertex_set is specified, will use the state's flipped ancillae.
 
+    This gives the same pairing as running partial_min_spanning_set on the
+    get_metagraph graph, but works on the DQ counts directly.
+
     """
-    vertex_set = vertex_set or state.get_flipped_ancillae()
-    return partial_min_spanning_set(
-        get_metagraph(state, vertex_set), vertex_set, weight="dq_count"  # type: ignore
+    vertex_set = vertex_set or state.flipped_ancillae_tuple
+    pair_counts, ground_i, ground_j, ground_counts = _metagraph_dq_counts(
+        state, vertex_set
     )
+    return [
+        (
+            vertex_set[u],
+            (VectorIJ(ground_i[u], ground_j[u]) if v is None else vertex_set[v]),
+        )
+        for u, v in _solve_pairing(pair_counts, ground_counts)
+    ]
 
 
-def get_metagraph(state: Surface, vertex_set: list[VectorIJ] | None = None) -> nx.Graph:
+def get_metagraph(
+    state: Surface, vertex_set: Sequence[VectorIJ] | None = None
+) -> nx.Graph:
     """
     Construct a meta-represntation that indicates the relationship between AQs
     and the DQs that must be used to connect them.
 
+    DQ counts come from the grid geometry directly, so no shortest paths are
+    searched here.
 
     """
-    min_ij = state.minimum_data_qbit_coordinate
-    max_ij = state.maximum_data_qbit_coordinate
-
-    vertex_set = vertex_set or state.get_flipped_ancillae()
-
-    g = state.get_graph()
+    vertex_set = vertex_set or state.flipped_ancillae_tuple
+    pair_counts, ground_i, ground_j, ground_counts = _metagraph_dq_counts(
+        state, vertex_set
+    )
 
     # First construct the weighted graph of all AQs' pairwise separations, as
     # well as the "ground" for each:
@@ -55,141 +180,121 @@ def get_metagraph(state: Surface, vertex_set: list[VectorIJ] | None = None) -> n
             # Create the edge (i,j):
             a_v = flipped_ancillae[v]
 
-            path = nx.shortest_path(g, a_u, a_v, weight="weight")
-
             metagraph.add_edge(
                 a_u,
                 a_v,
-                dq_count=len([v for v in path if v.i % 2 == 1]),
-                length=len(path),
+                dq_count=pair_counts[u][v],
                 is_to_edge=False,
-                path=path,
             )
 
-        # For each ancilla, also compute its separation to "ground":
-        if state.get_ancilla_type(a_u) == AncillaType.X:
-            # Check the closest VERTICAL edges (j axis):
-            dist_to_min_j = a_u.j - min_ij.j
-            dist_to_max_j = max_ij.j - a_u.j
-            if dist_to_min_j < dist_to_max_j:
-                best_j_node = (
-                    VectorIJ(a_u.i - 1, min_ij.j)
-                    if VectorIJ(a_u.i - 1, min_ij.j) in g
-                    else VectorIJ(a_u.i + 1, min_ij.j)
-                )
-            else:
-                best_j_node = (
-                    VectorIJ(a_u.i - 1, max_ij.j)
-                    if VectorIJ(a_u.i - 1, max_ij.j) in g
-                    else VectorIJ(a_u.i + 1, max_ij.j)
-                )
-            path = nx.shortest_path(g, a_u, best_j_node, weight="weight")
-            path_length = len(path)
-            # Add 1 to accommodate offset; subtract one to remove source vertex
-            metagraph.add_edge(
-                a_u,
-                best_j_node,
-                dq_count=len([v for v in path if v.i % 2 == 1]),
-                length=path_length,
-                is_to_edge=True,
-                path=path,
-            )
+        # For each ancilla, also compute its separation to "ground", the
+        # closest VERTICAL edge (j axis):
+        metagraph.add_edge(
+            a_u,
+            VectorIJ(ground_i[u], ground_j[u]),
+            dq_count=ground_counts[u],
+            is_to_edge=True,
+        )
+
+    return metagraph
+
+
+def _pymatching_solve(state: Surface, vertex_set: Sequence[VectorIJ]) -> list[VectorIJ]:
+    """
+    Decode the flipped AQs with PyMatching instead of the SQuEC pairing.
 
-        else:
+    """
+    for ancilla in vertex_set:
+        if state.get_ancilla_type(ancilla) != AncillaType.X:
             raise NotImplementedError("Y ancillae not yet supported.")
 
-    return metagraph
+    # The decoder's syndrome and correction bits are positional:
+    x_aqs, dqs = state.get_x_check_indices()
+    syndrome = np.isin(x_aqs, [state.node_index(a) for a in vertex_set])
+    correction = state.get_x_matching().decode(syndrome.astype(np.uint8))
+    return [state.node_at(k) for k in dqs[correction.astype(bool)].tolist()]
 
 
 def squec_solve(
-    state: Surface, vertex_set: list[VectorIJ] | None = None
+    state: Surface,
+    vertex_set: Sequence[VectorIJ] | None = None,
+    backend: str = "python",
 ) -> list[VectorIJ]:
     """
     Perform the SQuEC error correction algorithm on the given state.
 
     Returns a list of DQs to flip (by vertex ID).
 
+    Arguments:
+        state: the Surface to correct.
+        vertex_set: the flipped AQs. Defaults to the state's flipped ancillae.
+        backend: "python" to run SQuEC's own pairing, or "pymatching" to decode
+            with PyMatching's minimum-weight perfect matching (if installed).
+            Both flip a minimum number of DQs, but may pick different DQs
+            when there are several equally short corrections.
+
     """
-    # Get the list of flipped ancillae:
-    flipped_ancillae = state.get_flipped_ancillae()
-    vertex_set = vertex_set or flipped_ancillae
-    max_i = state.size_ij.i + state.origin_ij.i
-    max_j = state.size_ij.j + state.origin_ij.j
-    max_i_aq = max_i if max_i % 2 == 0 else max_i - 1
-    max_j_aq = max_j if max_j % 2 == 0 else max_j - 1
+    # Get the flipped ancillae:
+    vertex_set = vertex_set or state.flipped_ancillae_tuple
+
+    if backend == "pymatching":
+        return _pymatching_solve(state, vertex_set)
+    if backend != "python":
+        raise ValueError(f"Unknown squec_solve backend: {backend}")
 
-    # Get the graph state:
-    g = state.get_graph()
+    # Get the surface state:
+    dq_coords = state.get_data_qubits()
+    corner_flips = state.get_corner_flips()
 
     # The first step is to check for the single-flip case, which can be solved
     # through simple heuristics:
-    if len(vertex_set) == 1:
-        # First we check for the simple case where the ancilla is on a corner.
-        # These ancillae can only see two data qubits, only one of which is a
-        # valid option (since the other can be seen by a minimum of 2 AQs),
-        # so we can trivially flip the correct DQ.
-        ancilla = vertex_set[0]
-        ancilla_type = g.nodes[ancilla]["ancilla_type"]
-        if (
-            # Degree of 2 means the AQ's on an edge:
-            g.degree(ancilla) == 2  # type: ignore
-            # And on an edge:
-            and (
-                ancilla.i == state.origin_ij.i
-                or ancilla.j == state.origin_ij.j
-                or (ancilla.i == max_i_aq)
-                or (ancilla.j == max_j_aq)
-            )
-        ):
+    if len(vertex_set) == 1 and vertex_set[0] in corner_flips:
+        # This is the simple case where the ancilla is on a corner. These
+        # ancillae can only see two data qubits, only one of which is a valid
+        # option (since the other can be seen by a minimum of 2 AQs), so the
+        # correct DQ was already found when the Surface was built.
+        corner_dq = corner_flips[vertex_set[0]]
+        if corner_dq is None:
+            # If we reach this point, we have an invalid ancilla flip;
+            # this should never happen because it means we've encountered
+            # an ambiguous surface topology where multiple data qubits
+            # are adjacent to the flipped ancilla but no other AQs flipped.
+            arrays = state.get_arrays()
+            neighbors = arrays.neighbors(state.node_index(vertex_set[0]))
             dq_candidates = [
-                node
-                for node in g.neighbors(ancilla)
-                if g.nodes[node]["qubit_type"] == QubitType.DATA
+                state.node_at(k)
+                for k in neighbors[arrays.node_type[neighbors] == _NODE_DATA].tolist()
             ]
-            # There will be only one option of the two candidates that is valid
-            # to flip: It must be a data qubit with only one ancilla neighbor.
-            for dq in dq_candidates:
-                if (
-                    len(
-                        [
-                            node
-                            for node in g.neighbors(dq)
-                            if g.nodes[node]["qubit_type"] == QubitType.ANCILLA
-                            and g.nodes[node]["ancilla_type"] == ancilla_type
-                        ]
-                    )
-                    == 1
-                ):
-                    return [dq]
-            else:
-                # This is the "else" for the for loop, NOT the if...
-                # If we reach this point, we have an invalid ancilla flip;
-                # this should never happen because it means we've encountered
-                # an ambiguous surface topology where multiple data qubits
-                # are adjacent to the flipped ancilla but no other AQs flipped.
-                raise ValueError(
-                    "Invalid ancilla flip detected: Ambiguous solution found. "
-                    "The following DQs are both valid solutions: {dq_candidates}"
-                )
+            raise ValueError(
+                "Invalid ancilla flip detected: Ambiguous solution found. "
+                f"The following DQs are both valid solutions: {dq_candidates}"
+            )
+        return [corner_dq]
 
     # Now we handle the even-parity error correction.
     # We start by finding the optimal pairing of flipped ancillae:
     pairs = get_optimal_pairing(state, vertex_set)
 
-    # Get the paths:
-    pairs_with_paths = [
-        (pair, nx.shortest_path(g, pair[0], pair[1], weight="weight")) for pair in pairs
-    ]
+    # Get the paths, with one search per pair from its lower AQ (the far end of
+    # a ground pair is a DQ):
+    paths = _shortest_paths_from(
+        state,
+        [
+            (
+                source
+                if target in dq_coords
+                else min(source, target, key=lambda a: (a.i, a.j))
+            )
+            for source, target in pairs
+        ],
+    )
+    pairs_with_paths = [(pair, _cached_path(state, paths, *pair)) for pair in pairs]
 
     # Now we can walk along each path and flip the data qubits along the way.
-    # If you flip an already-flipped data qubit, you'll unflip it.
-    dq_to_flip = []
+    # If you flip an already-flipped data qubit, you'll unflip it, so the set of
+    # DQs to flip is the symmetric difference of the paths' DQs.
+    dq_to_flip: set[VectorIJ] = set()
     for (_source, _target), path in pairs_with_paths:
-        for node in path:
-            if g.nodes[node]["qubit_type"] == QubitType.DATA:
-                if node in dq_to_flip:
-                    dq_to_flip.remove(node)
-                else:
-                    dq_to_flip.append(node)
-
-    return dq_to_flip
+        dq_to_flip ^= dq_coords.intersection(path)
+
+    return list(dq_to_flip)
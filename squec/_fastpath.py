@@ -0,0 +1,83 @@
+"""
+Integer kernels for the grid geometry behind the metagraph.
+
+These are compiled to native code with Numba when it is installed, and run as
+plain Python otherwise.
+
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def grid_distance(i1: int, j1: int, i2: int, j2: int) -> int:
+    """
+    Count the DQs on a shortest path between two same-type AQs.
+
+    Every step from one DQ to the next (straight through a DQ-DQ edge, or
+    diagonally through an AQ) costs the same and moves up to 2 along both i and
+    j, so the count is the Chebyshev separation in DQ steps.
+
+    """
+    return max(abs(i1 - i2), abs(j1 - j2)) // 2
+
+
+@njit(cache=True)
+def ground_edge_target(
+    ai: int, aj: int, min_i: int, min_j: int, max_j: int
+) -> tuple[int, int]:
+    """
+    Get the boundary DQ that an X AQ pairs with when it goes to "ground".
+
+    This is the DQ on the nearer of the min/max j edges, in the row just below
+    the AQ (or just above it, for AQs on the first row).
+
+    """
+    tj = min_j if aj - min_j < max_j - aj else max_j
+    ti = ai - 1 if ai - 1 >= min_i else ai + 1
+    return ti, tj
+
+
+@njit(cache=True, parallel=True)
+def pairwise_dq_counts(ai: np.ndarray, aj: np.ndarray) -> np.ndarray:
+    """
+    Get the grid_distance between every pair of AQs.
+
+    """
+    n = ai.shape[0]
+    counts = np.zeros((n, n), dtype=np.int64)
+    for u in prange(n):
+        for v in range(n):
+            counts[u, v] = grid_distance(ai[u], aj[u], ai[v], aj[v])
+    return counts
+
+
+@njit(cache=True, parallel=True)
+def ground_dq_counts(
+    ai: np.ndarray, aj: np.ndarray, min_i: int, min_j: int, max_j: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get each AQ's ground_edge_target, and the DQ count of the path to it.
+
+    Returns the target i coordinates, target j coordinates, and DQ counts. The
+    path runs straight along j from the AQ's nearest DQ.
+
+    """
+    n = ai.shape[0]
+    ti = np.zeros(n, dtype=np.int64)
+    tj = np.zeros(n, dtype=np.int64)
+    counts = np.zeros(n, dtype=np.int64)
+    for u in prange(n):
+        ti[u], tj[u] = ground_edge_target(ai[u], aj[u], min_i, min_j, max_j)
+        counts[u] = abs(aj[u] - tj[u]) // 2 + 1
+    return ti, tj, counts
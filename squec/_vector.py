@@ -0,0 +1,137 @@
+"""
+The VectorIJ coordinate type.
+
+This module is kept free of third-party imports (besides mypyc's own
+decorators) so that it can be compiled to a C extension with mypyc (see
+build.py).
+
+mypyc checks argument and attribute types at run time, but vectors can also
+hold floats and other numbers. So operands are typed as object here, and
+components are read through _components, to behave the same whether or not
+the module is compiled.
+
+"""
+
+from typing import Any, Callable, NamedTuple, TypeVar
+
+try:
+    from mypy_extensions import mypyc_attr
+except ImportError:
+
+    _T = TypeVar("_T")
+
+    def mypyc_attr(*attrs: str, **kwattrs: object) -> Callable[[_T], _T]:
+        return lambda cls: cls
+
+
+# Vectors are immutable, so the first few thousand distinct ones that are
+# created are shared instead of being allocated again:
+_INTERN_LIMIT = 4096
+_INTERN: dict[tuple, "VectorIJ"] = {}
+
+
+class _VectorIJ(NamedTuple):
+    i: int
+    j: int
+
+
+def _components(vector: Any) -> tuple[Any, Any]:
+    """
+    Get the first two items of a vector, tuple or list, without type checks.
+
+    """
+    return vector[0], vector[1]
+
+
+# mypyc can't compile a tuple subclass to a native class, but it still compiles
+# the methods of a regular Python class:
+@mypyc_attr(native_class=False)
+class VectorIJ(_VectorIJ):
+    """
+    Represents a vector with i and j components.
+
+    Vectors are immutable (i, j) tuples, so they compare and hash like plain
+    tuples and can be looked up by them.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, *args: object) -> "VectorIJ":
+        if len(args) == 1:
+            # A VectorIJ, tuple or list:
+            args = tuple(args[0])  # type: ignore
+        # Only plain int vectors are shared, since (1.0, 2.0) and (True, 2) would
+        # otherwise be looked up as the cached (1, 2):
+        if (
+            cls is not VectorIJ
+            or len(args) != 2
+            or type(args[0]) is not int
+            or type(args[1]) is not int
+        ):
+            return _VectorIJ.__new__(cls, *args)  # type: ignore
+        vector = _INTERN.get(args)
+        if vector is None:
+            vector = _VectorIJ.__new__(cls, *args)  # type: ignore
+            if len(_INTERN) < _INTERN_LIMIT:
+                _INTERN[args] = vector
+        return vector
+
+    def __sub__(self, other: object) -> "VectorIJ":
+        """
+        Subtract another vector or tuple from this vector.
+
+        Uses Manhattan distance.
+        """
+        # VectorIJ, tuple and list operands all index the same way:
+        try:
+            other_i, other_j = _components(other)
+        except (TypeError, IndexError, KeyError):
+            raise ValueError(
+                f"Invalid operand type for vector subtraction. Expected VectorIJ, tuple, or list, but got {type(other)}"
+            ) from None
+        i, j = _components(self)
+        return VectorIJ(i - other_i, j - other_j)
+
+    def separation_from(self, other: object) -> "VectorIJ":
+        if self is other:
+            return _ZERO_VEC
+        return self - other
+
+    # VectorIJ.separation(a, b)
+    @staticmethod
+    def separation(a: "VectorIJ", b: object) -> "VectorIJ":
+        return a.separation_from(b)
+
+    def clone(self) -> "VectorIJ":
+        """
+        Get a vector with the same i and j components.
+
+        Vectors are immutable, so this is the vector itself.
+
+        """
+        return self
+
+    def __add__(self, other: object) -> "VectorIJ":  # type: ignore[override]
+        """
+        Add another vector or tuple to this vector.
+        """
+        # VectorIJ, tuple and list operands all index the same way:
+        try:
+            other_i, other_j = _components(other)
+        except (TypeError, IndexError, KeyError):
+            raise ValueError(
+                f"Invalid operand type for vector addition. Expected VectorIJ, tuple, or list, but got {type(other)}"
+            ) from None
+        i, j = _components(self)
+        return VectorIJ(i + other_i, j + other_j)
+
+    def __radd__(self, other: object) -> "VectorIJ":  # type: ignore[override]
+        # Tuples would otherwise concatenate when a vector is added to them:
+        return self.__add__(other)
+
+    def __repr__(self) -> str:
+        i, j = _components(self)
+        return f"({i}, {j})"
+
+
+_ZERO_VEC = VectorIJ(0, 0)
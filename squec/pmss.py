@@ -1,22 +1,85 @@
-from itertools import combinations
-from typing import Hashable
+from typing import Hashable, Sequence
+
+import networkx as nx
 
 VertexID = Hashable
 
 
-def _edges_span_required(
-    combo: list[tuple[VertexID, VertexID]], vbunch: list[VertexID]
-) -> bool:
-    """Return true if all vertices are included in the set."""
-    for v in vbunch:
-        found = False
-        for edge in combo:
-            if v in edge:
-                found = True
-                break
-        if not found:
-            return False
-    return True
+def _matched_edges(
+    vertex_count: int, edges: Sequence[tuple[int, int | None, float]]
+) -> list[int]:
+    """
+    Choose the minimum-weight set of edges that covers each vertex once.
+
+    Vertices are numbered from 0 to vertex_count - 1. Each edge is a tuple of
+    (vertex, other vertex or None for "ground", cost). Several vertices may
+    share ground, and a vertex only uses its cheapest ground edge.
+
+    This is solved as a minimum-weight perfect matching: each vertex x gets a
+    virtual boundary partner, vertex_count + x (reached through its cheapest
+    ground edge), and boundary partners can pair with each other at no cost,
+    so only the real vertices' pairings affect the total weight.
+
+    Returns the indices into edges of the chosen edges.
+
+    """
+    matching_graph = nx.Graph()
+    matching_graph.add_nodes_from(range(vertex_count))
+
+    # For each vertex, remember the cheapest edge to ground:
+    ground_edges: dict[int, int] = {}
+    for rank, (x, y, cost) in enumerate(edges):
+        if y is not None:
+            matching_graph.add_edge(x, y, weight=cost, rank=rank)
+        elif x not in ground_edges or cost < edges[ground_edges[x]][2]:
+            ground_edges[x] = rank
+
+    for x, rank in ground_edges.items():
+        matching_graph.add_edge(
+            x,
+            vertex_count + x,
+            weight=edges[rank][2],
+            rank=rank,
+        )
+    boundary_nodes = [vertex_count + x for x in ground_edges]
+    for a in range(len(boundary_nodes)):
+        for b in range(a + 1, len(boundary_nodes)):
+            matching_graph.add_edge(boundary_nodes[a], boundary_nodes[b], weight=0)
+
+    matching = nx.algorithms.matching.min_weight_matching(
+        matching_graph, weight="weight"
+    )
+
+    # Strip the boundary-to-boundary pairs:
+    return [
+        matching_graph.edges[x, y]["rank"]
+        for x, y in matching
+        if x < vertex_count or y < vertex_count
+    ]
+
+
+def _solve_pairing(
+    pair_costs: Sequence[Sequence[int]], ground_costs: Sequence[int]
+) -> list[tuple[int, int | None]]:
+    """
+    Pair up vertices 0 to n - 1, given dense costs, at minimum total cost.
+
+    pair_costs[u][v] is the cost of pairing u with v (for u < v), and
+    ground_costs[u] the cost of pairing u with ground instead. Returns (u, v)
+    pairs, where v is None when u is paired with ground.
+
+    This is partial_min_spanning_set for a complete graph, without building
+    the graph first.
+
+    """
+    edges: list[tuple[int, int | None, float]] = []
+    for u in range(len(ground_costs)):
+        edges.extend((u, v, pair_costs[u][v]) for v in range(u + 1, len(ground_costs)))
+        edges.append((u, None, ground_costs[u]))
+    return [
+        (edges[rank][0], edges[rank][1])
+        for rank in _matched_edges(len(ground_costs), edges)
+    ]
 
 
 def partial_min_spanning_set(
@@ -27,6 +90,10 @@ def partial_min_spanning_set(
     set is minimized, and the set is selected so that all vertices V where
     vertices_required[V] == True must be included.
 
+    Vertices that are not required act as "ground": a required vertex may be
+    satisfied by an edge to any one of its non-required neighbors, and several
+    required vertices may share the same ground vertex.
+
     Arguments:
         graph: nx.Graph
         required_vertices: A list of required verts
@@ -34,48 +101,33 @@ def partial_min_spanning_set(
             not specified, it will be assumed to be 1.
 
     """
+    required = set(required_vertices)
+    # Number the vertices in the given order (not the set's), so that ties are
+    # broken the same way in every run:
+    index = {vertex: x for x, vertex in enumerate(dict.fromkeys(required_vertices))}
 
-    # Naive form: Produce all possible subsets of edges, with and without the
-    # required vertices.
-    possible_edge_sets = []
-    possible_edge_costs = []
-
-    # First produce the set of edges that connect required vertices:
-    # required_vertex_subgraph = nx.subgraph(graph, required_vertices)
-    # Candidate edge sets include even those that don't span all the required
-    # vertices...
-    all_combinations: list[list[tuple[VertexID, VertexID]]] = [
-        list(item)
-        # todo: start at len(reqs)/2
-        for length in range(1, len(graph.edges) + 1)
-        for item in combinations(graph.edges, length)
-    ]
-    combinations_containing_required = [
-        combo
-        for combo in all_combinations
-        if _edges_span_required(combo, required_vertices)
-    ]
+    # Orient each edge so that a required vertex comes first:
+    candidate_edges = []
+    for u, v, cost in graph.edges(data=weight, default=1):
+        if u not in required:
+            u, v = v, u
+        if u in required:
+            candidate_edges.append((u, v, cost))
 
-    # Now loop through and remove any supersets. These can never be a valid
-    # solution because there's guaranteed to be another option (the subset)
-    # for which the weight is vacuously lower.
-    # TODO: If weight can be 0, then this is not necessarily true...
-    sorted_combinations_containing_required = sorted(
-        combinations_containing_required, key=len
-    )
-    filtered_sorted_combinations_containing_required = []
-    for combo in sorted_combinations_containing_required:
-        if not any(
-            set(combo).issuperset(set(old_combo))
-            for old_combo in filtered_sorted_combinations_containing_required
-        ):
-            filtered_sorted_combinations_containing_required.append(combo)
-
-    possible_edge_sets = filtered_sorted_combinations_containing_required
-    possible_edge_costs = [
-        sum(edge[weight] for u, v, edge in graph.edges(data=True) if (u, v) in edge_set)
-        for edge_set in possible_edge_sets
+    edge_set = [
+        (candidate_edges[rank][0], candidate_edges[rank][1])
+        for rank in _matched_edges(
+            len(index),
+            [
+                (index[u], index[v] if v in required else None, cost)
+                for u, v, cost in candidate_edges
+            ],
+        )
     ]
 
-    # The winning set is the one with the smallest cost:
-    return min(zip(possible_edge_sets, possible_edge_costs), key=lambda x: x[1])[0]
+    if not required.issubset(vertex for edge in edge_set for vertex in edge):
+        raise ValueError(
+            "No set of edges spans all of the required vertices: "
+            f"{required_vertices}"
+        )
+    return edge_set
@@ -1,8 +1,32 @@
 from dataclasses import dataclass
-from typing import Set, Union
+from functools import cached_property
+from typing import Iterable, Set, Union
 from enum import Enum
+import heapq
+import importlib.util
+import math
 
 import networkx as nx
+import numpy as np
+
+from ._vector import VectorIJ
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:
+    csr_matrix = None
+
+try:
+    import pymatching
+except ImportError:
+    pymatching = None
+
+# Surfaces with at least this many vertices dispatch their shortest-path
+# searches to the nx-cugraph GPU backend, if it is installed. On smaller
+# surfaces, the GPU transfer and launch overhead outweighs the search itself.
+_GPU_MIN_NODES = 5000
+_HAS_CUGRAPH = importlib.util.find_spec("nx_cugraph") is not None
 
 _FLIP_COLOR = "#FF0000"
 _FLIP_SIZE = 1.4
@@ -28,88 +52,9 @@ class AncillaType(Enum):
         return self.value
 
 
-@dataclass
-class VectorIJ:
-    """
-    Represents a vector with i and j components.
-    """
-
-    i: int
-    j: int
-
-    def __init__(
-        self,
-        *args: Union["VectorIJ", tuple[int, int], list[int], int],
-    ):
-        if isinstance(args[0], VectorIJ):
-            self.i, self.j = args[0].i, args[0].j
-        elif isinstance(args[0], (tuple, list)):
-            self.i, self.j = args[0]
-        else:
-            self.i, self.j = args  # type: ignore
-
-    def __eq__(self, other: "VectorIJ") -> bool:
-        if isinstance(other, VectorIJ):
-            return self.i == other.i and self.j == other.j
-        if isinstance(other, (tuple, list)) and len(other) == 2:
-            return self.i == other[0] and self.j == other[1]
-        return False
-
-    def __sub__(
-        self, other: Union["VectorIJ", tuple[int, int], list[int]]
-    ) -> "VectorIJ":
-        """
-        Subtract another vector or tuple from this vector.
-
-        Uses Manhattan distance.
-        """
-        if isinstance(other, VectorIJ):
-            return VectorIJ(self.i - other.i, self.j - other.j)
-        elif isinstance(other, (tuple, list)) and len(other) == 2:
-            return VectorIJ(self.i - other[0], self.j - other[1])
-        else:
-            raise ValueError(
-                f"Invalid operand type for vector subtraction. Expected VectorIJ, tuple, or list, but got {type(other)}"
-            )
-
-    def __hash__(self) -> int:
-        return hash((self.i, self.j))
-
-    def separation_from(self, other: "VectorIJ") -> "VectorIJ":
-        return self - other
-
-    # VectorIJ.separation(a, b)
-    @staticmethod
-    def separation(a: "VectorIJ", b: "VectorIJ") -> "VectorIJ":
-        return a - b
-
-    def clone(self) -> "VectorIJ":
-        """
-        Create a new vector with the same i and j components.
-
-        """
-        return VectorIJ(self.i, self.j)
-
-    def __add__(
-        self, other: Union["VectorIJ", tuple[int, int], list[int]]
-    ) -> "VectorIJ":
-        """
-        Add another vector or tuple to this vector.
-        """
-        if isinstance(other, VectorIJ):
-            return VectorIJ(self.i + other.i, self.j + other.j)
-        elif isinstance(other, (tuple, list)) and len(other) == 2:
-            return VectorIJ(self.i + other[0], self.j + other[1])
-        else:
-            raise ValueError(
-                f"Invalid operand type for vector addition. Expected VectorIJ, tuple, or list, but got {type(other)}"
-            )
-
-    def __repr__(self) -> str:
-        return f"({self.i}, {self.j})"
-
-
 class Qubit:
+    __slots__ = ("loc", "type")
+
     loc: VectorIJ
     type: QubitType
 
@@ -117,13 +62,14 @@ class Qubit:
         self.loc = loc
 
     def separation_from(self, other: "Qubit") -> VectorIJ:
-        return self.loc - other.loc
+        return self.loc.separation_from(other.loc)
 
     def __repr__(self) -> str:
         return "<DQ>"
 
 
 class Ancilla(Qubit):
+    __slots__ = ("ancilla_type",)
 
     def __init__(self, loc: VectorIJ, ancilla_type: AncillaType) -> None:
         super().__init__(loc)
@@ -133,109 +79,408 @@ class Ancilla(Qubit):
         return f"<AQ({self.ancilla_type})>"
 
 
-def _create_surface_graph(
-    size_ij: VectorIJ, origin_ij: VectorIJ | None = None
-) -> nx.Graph:
+# Integer codes used in SurfaceArrays:
+_NODE_DATA = 0
+_NODE_ANCILLA = 1
+_ANCILLA_X = 0
+_ANCILLA_Z = 1
+_ANCILLA_NONE = 255
+_ANCILLA_TYPES = {_ANCILLA_X: AncillaType.X, _ANCILLA_Z: AncillaType.Z}
+
+
+@dataclass
+class SurfaceArrays:
     """
-    Create a NetworkX.Graph object that represents the Surface.
+    A struct-of-arrays layout of a Surface.
 
-    The nodes of the graph are the qubits and the edges are the connections
-    between them. The vertex IDs double as the qubit coordinates.
+    Vertices are numbered 0..n-1; vertex k is the qubit at (coords_i[k],
+    coords_j[k]). Adjacency is stored in CSR form: the neighbors of vertex k
+    are indices[indptr[k]:indptr[k + 1]], with edge weights in the matching
+    slice of weights.
+    """
+
+    coords_i: np.ndarray
+    coords_j: np.ndarray
+    node_type: np.ndarray
+    ancilla_type: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.coords_i)
+
+    def neighbors(self, k: int) -> np.ndarray:
+        """
+        Get the vertex numbers of the neighbors of vertex k.
+        """
+        return self.indices[self.indptr[k] : self.indptr[k + 1]]
+
+
+def _first_occurrences(keys: np.ndarray) -> np.ndarray:
+    """
+    Get the positions of the first occurrence of each distinct key, in order.
+
+    """
+    _unique, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+
+def _build_surface_soa(
+    size_ij: VectorIJ, origin_ij: VectorIJ | None = None
+) -> SurfaceArrays:
+    """
+    Lay out the qubits of a Surface and their connections as SurfaceArrays.
 
     Data qubits all land on odd i and j coordinates, while ancilla qubits land
     on even i and j coordinates (starting from 0).
+
+    The layout is computed with array operations, but vertices and neighbors
+    are numbered as if the qubits and edges were added one at a time, row by
+    row: first the data qubits with the edges to their neighbors, then the
+    ancilla qubits with their diagonal edges.
     """
     if origin_ij is None:
         origin_ij = VectorIJ(0, 0)
-    g = nx.Graph()
-    # First create the grid of data qubits:
-    for i in range(origin_ij.i + 1, size_ij.i + origin_ij.i, 2):
-        for j in range(origin_ij.j + 1, size_ij.j + origin_ij.j, 2):
-            g.add_node(
-                VectorIJ(i, j), qubit_type=QubitType.DATA, qubit=Qubit(VectorIJ(i, j))
-            )
-            # Add edges to the left and right neighbors:
-            if i > origin_ij.i + 1:
-                g.add_edge(VectorIJ(i, j), VectorIJ(i - 2, j), weight=2)
-            if i < (size_ij.i + origin_ij.i - 1):
-                g.add_edge(VectorIJ(i, j), VectorIJ(i + 2, j), weight=2)
-            # Add edges to the top and bottom neighbors:
-            if j > origin_ij.j + 1:
-                g.add_edge(VectorIJ(i, j), VectorIJ(i, j - 2), weight=2)
-            if j < (size_ij.j + origin_ij.j - 1):
-                g.add_edge(VectorIJ(i, j), VectorIJ(i, j + 2), weight=2)
-    # Now create the grid of ancilla qubits:
-    for i in range(origin_ij.i, size_ij.i + origin_ij.i, 2):
-        for j in range(origin_ij.j, size_ij.j + origin_ij.j, 2):
-            # Don't create the origin node if it's a data qubit:
-            if i == origin_ij.i and j == origin_ij.j:
-                continue
+    min_i, min_j = origin_ij.i, origin_ij.j
+    end_i, end_j = size_ij.i + origin_ij.i, size_ij.j + origin_ij.j
+
+    # Every coordinate touched below is within 2 of the grid, so each one gets
+    # a flat integer key:
+    width = max(size_ij.j, 0) + 5
+
+    def key(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        return (i - min_i + 2) * width + (j - min_j + 2)
+
+    key_count = (max(size_ij.i, 0) + 5) * width
+
+    # Each qubit adds itself, then up to four edges, in this order. Events are
+    # laid out as rows of 5 (the qubit, then its edges) so that flattening them
+    # puts them in the order they would be added one at a time:
+    dq_i, dq_j = (
+        values.ravel()
+        for values in np.meshgrid(
+            np.arange(min_i + 1, end_i, 2),
+            np.arange(min_j + 1, end_j, 2),
+            indexing="ij",
+        )
+    )
+    dq_steps = np.array([(0, 0), (-2, 0), (2, 0), (0, -2), (0, 2)])
+    dq_valid = np.stack(
+        [
+            np.ones(len(dq_i), dtype=bool),
+            dq_i > min_i + 1,
+            dq_i < end_i - 1,
+            dq_j > min_j + 1,
+            dq_j < end_j - 1,
+        ],
+        axis=1,
+    )
+    dq_targets = key(dq_i[:, None] + dq_steps[:, 0], dq_j[:, None] + dq_steps[:, 1])
+    dq_keys = dq_targets[:, 0]
+
+    # Don't create the origin node (it's a data qubit), X-type ancillas on the
+    # row of the origin node, or Z-type ancillas on the column of the origin:
+    aq_i, aq_j = (
+        values.ravel()
+        for values in np.meshgrid(
+            np.arange(min_i, end_i, 2), np.arange(min_j, end_j, 2), indexing="ij"
+        )
+    )
+    aq_kept = (
+        ~((aq_i == min_i) & (aq_j == min_j))
+        & ~((aq_i == min_i) & (aq_j % 4 == 2))
+        & ~((aq_j == min_j) & (aq_i % 4 == 0))
+    )
+    aq_i, aq_j = aq_i[aq_kept], aq_j[aq_kept]
+    aq_keys = key(aq_i, aq_j)
+
+    # Ancillas only connect to the data qubits (or far ends of data qubit
+    # edges) that already exist:
+    exists = np.zeros(key_count, dtype=bool)
+    exists[dq_targets[dq_valid]] = True
+    aq_steps = np.array([(0, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)])
+    aq_targets = key(aq_i[:, None] + aq_steps[:, 0], aq_j[:, None] + aq_steps[:, 1])
+    aq_valid = np.stack(
+        [
+            np.ones(len(aq_i), dtype=bool),
+            (aq_i > min_i) & (aq_j > min_j),
+            (aq_i > min_i) & (aq_j < end_j - 1),
+            (aq_i < end_i - 1) & (aq_j > min_j),
+            (aq_i < end_i - 1) & (aq_j < end_j - 1),
+        ],
+        axis=1,
+    )
+    aq_valid[:, 1:] &= exists[aq_targets[:, 1:]]
+
+    # Vertices are numbered in the order they are first added:
+    node_events = np.concatenate([dq_targets[dq_valid], aq_keys])
+    node_keys = node_events[_first_occurrences(node_events)]
+
+    # Each edge adds a neighbor to both of its ends; a repeated edge keeps the
+    # neighbor's first position:
+    edge_sources = np.concatenate(
+        [
+            np.broadcast_to(dq_keys[:, None], dq_targets.shape)[:, 1:][dq_valid[:, 1:]],
+            np.broadcast_to(aq_keys[:, None], aq_targets.shape)[:, 1:][aq_valid[:, 1:]],
+        ]
+    )
+    edge_targets = np.concatenate(
+        [dq_targets[:, 1:][dq_valid[:, 1:]], aq_targets[:, 1:][aq_valid[:, 1:]]]
+    )
+    edge_weights = np.concatenate(
+        [
+            np.full(np.count_nonzero(dq_valid[:, 1:]), 2, dtype=np.int64),
+            np.full(np.count_nonzero(aq_valid[:, 1:]), 1, dtype=np.int64),
+        ]
+    )
+    half_sources = np.stack([edge_sources, edge_targets], axis=1).ravel()
+    half_targets = np.stack([edge_targets, edge_sources], axis=1).ravel()
+    half_weights = np.repeat(edge_weights, 2)
+    first = _first_occurrences(half_sources * key_count + half_targets)
+    half_sources, half_targets, half_weights = (
+        half_sources[first],
+        half_targets[first],
+        half_weights[first],
+    )
+
+    ancilla_types = np.zeros(key_count, dtype=np.uint8)
+    has_type = np.zeros(key_count, dtype=bool)
+    ancilla_types[dq_keys] = _ANCILLA_NONE
+    ancilla_types[aq_keys] = np.where((aq_i + aq_j) % 4 == 0, _ANCILLA_X, _ANCILLA_Z)
+    has_type[dq_keys] = True
+    has_type[aq_keys] = True
+
+    # Remove any node that was only created as the far end of an edge:
+    node_keys = node_keys[has_type[node_keys]]
+    half_kept = has_type[half_sources] & has_type[half_targets]
+    half_sources, half_targets, half_weights = (
+        half_sources[half_kept],
+        half_targets[half_kept],
+        half_weights[half_kept],
+    )
+
+    # Lay the neighbors out as CSR, sorted by vertex and then by the order they
+    # were added:
+    order = np.full(key_count, -1, dtype=np.int64)
+    order[node_keys] = np.arange(len(node_keys))
+    by_source = np.argsort(order[half_sources], kind="stable")
+    half_sources, half_targets, half_weights = (
+        order[half_sources[by_source]],
+        order[half_targets[by_source]],
+        half_weights[by_source],
+    )
+    indptr = np.zeros(len(node_keys) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(half_sources, minlength=len(node_keys)))
+
+    # Remove degree-1 nodes, visiting them in order. Removing a node can leave
+    # a later neighbor with a degree of 1 by the time it is visited:
+    removed = np.zeros(len(node_keys), dtype=bool)
+    degree = np.diff(indptr)
+    # (A sorted list is already a heap.)
+    candidates = np.flatnonzero(degree == 1).tolist()
+    while candidates:
+        k = heapq.heappop(candidates)
+        if removed[k] or degree[k] != 1:
+            continue
+        removed[k] = True
+        for neighbor in half_targets[indptr[k] : indptr[k + 1]].tolist():
+            degree[neighbor] -= 1
+            if neighbor > k and degree[neighbor] == 1:
+                heapq.heappush(candidates, neighbor)
 
-            # Don't create X-type ancillas on the row of the origin node:
-            if i == origin_ij.i and j % 4 == 2:
-                continue
-            # Don't create Z-type ancillas on the column of the origin node:
-            if j == origin_ij.j and i % 4 == 0:
-                continue
+    # Remove all Z-type ancillas that are at the right edge of the grid:
+    coords_i = node_keys // width + min_i - 2
+    coords_j = node_keys % width + min_j - 2
+    node_ancilla_types = ancilla_types[node_keys]
+    if size_ij.i >= 4 and size_ij.j >= 4:
+        # The last row and column of the grid always keep some qubits:
+        max_i, max_j = end_i - 1, end_j - 1
+    else:
+        max_i = coords_i[~removed].max()
+        max_j = coords_j[~removed].max()
+    removed |= ((node_ancilla_types == _ANCILLA_Z) & (coords_i == max_i)) | (
+        (node_ancilla_types == _ANCILLA_X) & (coords_j == max_j)
+    )
+
+    # Number the remaining vertices and fill the arrays:
+    renumber = np.cumsum(~removed) - 1
+    half_kept = ~removed[half_sources] & ~removed[half_targets]
+    indptr = np.zeros(np.count_nonzero(~removed) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(
+        np.bincount(renumber[half_sources[half_kept]], minlength=len(indptr) - 1)
+    )
+    return SurfaceArrays(
+        coords_i=coords_i[~removed],
+        coords_j=coords_j[~removed],
+        node_type=np.where(
+            node_ancilla_types[~removed] == _ANCILLA_NONE, _NODE_DATA, _NODE_ANCILLA
+        ).astype(np.uint8),
+        ancilla_type=node_ancilla_types[~removed],
+        indptr=indptr,
+        indices=renumber[half_targets[half_kept]],
+        weights=half_weights[half_kept],
+    )
+
+
+def _create_surface_graph(
+    arrays: SurfaceArrays, idx_to_node: list[VectorIJ]
+) -> nx.Graph:
+    """
+    Create a NetworkX.Graph object that represents the Surface.
+
+    The nodes of the graph are the qubits and the edges are the connections
+    between them. The vertex IDs double as the qubit coordinates.
+    """
+    g = nx.Graph()
+    for k, node in enumerate(idx_to_node):
+        if arrays.node_type[k] == _NODE_DATA:
+            g.add_node(node, qubit_type=QubitType.DATA, qubit=Qubit(node))
+        else:
+            ancilla_type = _ANCILLA_TYPES[arrays.ancilla_type[k]]
             g.add_node(
-                VectorIJ(i, j),
+                node,
                 qubit_type=QubitType.ANCILLA,
-                ancilla_type=AncillaType.X if (i + j) % 4 == 0 else AncillaType.Z,
-                qubit=Ancilla(
-                    VectorIJ(i, j), AncillaType.X if (i + j) % 4 == 0 else AncillaType.Z
-                ),
-            )
-            # Add the diagonal edges to the data qubits:
-            if i > origin_ij.i and j > origin_ij.j and g.has_node((i - 1, j - 1)):
-                g.add_edge(VectorIJ(i, j), VectorIJ(i - 1, j - 1), weight=1)
-            if (
-                i > origin_ij.i
-                and j < (size_ij.j + origin_ij.j - 1)
-                and g.has_node((i - 1, j + 1))
-            ):
-                g.add_edge(VectorIJ(i, j), VectorIJ(i - 1, j + 1), weight=1)
-            if (
-                i < (size_ij.i + origin_ij.i - 1)
-                and j > origin_ij.j
-                and g.has_node(VectorIJ(i + 1, j - 1))
-            ):
-                g.add_edge(VectorIJ(i, j), VectorIJ(i + 1, j - 1), weight=1)
-            if (
-                i < (size_ij.i + origin_ij.i - 1)
-                and j < (size_ij.j + origin_ij.j - 1)
-                and g.has_node(VectorIJ(i + 1, j + 1))
-            ):
-                g.add_edge(VectorIJ(i, j), VectorIJ(i + 1, j + 1), weight=1)
-
-    # Remove any node that doesn't have a qubit object:
-    for node in list(g.nodes()):
-        if "qubit" not in g.nodes[node]:
-            g.remove_node(node)
-
-    # Remove degree-1 nodes:
-    for node in list(g.nodes()):
-        if g.degree(node) == 1:  # type: ignore
-            g.remove_node(node)
-
-    # Remove all Z-type ancillas that are at the right edge of the grid:
-    max_i = max([node.i for node in g.nodes()])
-    max_j = max([node.j for node in g.nodes()])
-    for node in list(g.nodes()):
-        if (
-            g.nodes[node]["qubit_type"] == QubitType.ANCILLA
-            and (
-                g.nodes[node].get("ancilla_type", "") == AncillaType.Z
-                and node.i == max_i
-            )
-            or (
-                g.nodes[node].get("ancilla_type", "") == AncillaType.X
-                and node.j == max_j
+                ancilla_type=ancilla_type,
+                qubit=Ancilla(node, ancilla_type),
             )
+    for k, node in enumerate(idx_to_node):
+        start, stop = arrays.indptr[k], arrays.indptr[k + 1]
+        for neighbor, weight in zip(
+            arrays.indices[start:stop].tolist(), arrays.weights[start:stop].tolist()
         ):
-            g.remove_node(node)
+            g.add_edge(node, idx_to_node[neighbor], weight=weight)
     return g
 
 
+def _group_aq_neighbors(arrays: SurfaceArrays, k: int) -> dict[AncillaType, list[int]]:
+    """
+    Group the AQ neighbors of vertex k by their ancilla type.
+
+    """
+    by_type: dict[AncillaType, list[int]] = {
+        ancilla_type: [] for ancilla_type in AncillaType
+    }
+    for neighbor in arrays.neighbors(k).tolist():
+        if arrays.node_type[neighbor] == _NODE_ANCILLA:
+            by_type[_ANCILLA_TYPES[arrays.ancilla_type[neighbor]]].append(neighbor)
+    return by_type
+
+
+def _create_corner_flip_table(
+    arrays: SurfaceArrays, size_ij: VectorIJ, origin_ij: VectorIJ
+) -> dict[int, int | None]:
+    """
+    Find the DQ to flip for a single flipped AQ on a corner of the Surface.
+
+    A corner AQ can only see two data qubits, and the one to flip is the one
+    that no other AQ of the same type can see. Maps the vertex number of each
+    corner AQ to that of its DQ, or to None where no DQ satisfies this.
+
+    """
+    max_i = size_ij.i + origin_ij.i
+    max_j = size_ij.j + origin_ij.j
+    max_i_aq = max_i if max_i % 2 == 0 else max_i - 1
+    max_j_aq = max_j if max_j % 2 == 0 else max_j - 1
+
+    # Corner AQs have a degree of 2 and lie on an edge:
+    is_corner = (
+        (arrays.node_type == _NODE_ANCILLA)
+        & (np.diff(arrays.indptr) == 2)
+        & (
+            (arrays.coords_i == origin_ij.i)
+            | (arrays.coords_j == origin_ij.j)
+            | (arrays.coords_i == max_i_aq)
+            | (arrays.coords_j == max_j_aq)
+        )
+    )
+
+    table: dict[int, int | None] = {}
+    for k in np.flatnonzero(is_corner).tolist():
+        neighbors = arrays.neighbors(k)
+        ancilla_type = _ANCILLA_TYPES[arrays.ancilla_type[k]]
+        table[k] = next(
+            (
+                dq
+                for dq in neighbors[arrays.node_type[neighbors] == _NODE_DATA].tolist()
+                if len(_group_aq_neighbors(arrays, dq)[ancilla_type]) == 1
+            ),
+            None,
+        )
+    return table
+
+
+def _create_index_grid(arrays: SurfaceArrays) -> tuple[np.ndarray, VectorIJ]:
+    """
+    Lay out the vertex numbers of the surface on a dense grid.
+
+    Returns the grid, which is -1 where there is no qubit, and the coordinate
+    of its [0, 0] cell.
+    """
+    if len(arrays) == 0:
+        return np.full((0, 0), -1, dtype=np.int64), VectorIJ(0, 0)
+    min_i, min_j = int(arrays.coords_i.min()), int(arrays.coords_j.min())
+    grid = np.full(
+        (
+            int(arrays.coords_i.max()) - min_i + 1,
+            int(arrays.coords_j.max()) - min_j + 1,
+        ),
+        -1,
+        dtype=np.int64,
+    )
+    grid[arrays.coords_i - min_i, arrays.coords_j - min_j] = np.arange(len(arrays))
+    return grid, VectorIJ(min_i, min_j)
+
+
+def _create_x_check_indices(arrays: SurfaceArrays) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the vertex numbers of the surface's X AQs, and of its DQs.
+
+    These are the rows and columns of the X parity-check matrix, in vertex
+    order.
+    """
+    x_aqs = np.flatnonzero(
+        (arrays.node_type == _NODE_ANCILLA) & (arrays.ancilla_type == _ANCILLA_X)
+    )
+    dqs = np.flatnonzero(arrays.node_type == _NODE_DATA)
+    return x_aqs, dqs
+
+
+def _create_x_check_matrix(arrays: SurfaceArrays, x_aqs: np.ndarray, dqs: np.ndarray):
+    """
+    Create the SciPy CSR parity-check matrix of the surface's X AQs.
+
+    Row r is the X AQ x_aqs[r] and column c the DQ dqs[c], as returned by
+    _create_x_check_indices; an entry is 1 where the DQ is adjacent to the AQ.
+    """
+    # AQs are only ever adjacent to DQs:
+    degrees = arrays.indptr[x_aqs + 1] - arrays.indptr[x_aqs]
+    columns = np.searchsorted(
+        dqs, np.concatenate([arrays.neighbors(k) for k in x_aqs.tolist()])
+    )
+    return csr_matrix(
+        (
+            np.ones(len(columns), dtype=np.uint8),
+            columns,
+            np.concatenate(([0], np.cumsum(degrees))),
+        ),
+        shape=(len(x_aqs), len(dqs)),
+    )
+
+
+def _create_csr(arrays: SurfaceArrays):
+    """
+    Create a SciPy CSR weight matrix for the surface's vertices.
+
+    Returns None if SciPy is not installed.
+    """
+    if csr_matrix is None:
+        return None
+    return csr_matrix(
+        (arrays.weights, arrays.indices, arrays.indptr), shape=(len(arrays),) * 2
+    )
+
+
 class Surface:
     """
     A Surface represents the network connectivity of SQuEC qubits.
@@ -262,7 +507,24 @@ class Surface:
             self.origin_ij = VectorIJ(origin_ij)
         else:
             self.origin_ij = VectorIJ(0, 0)
-        self.graph = _create_surface_graph(self.size_ij, self.origin_ij)
+        self._arrays = _build_surface_soa(self.size_ij, self.origin_ij)
+        self._graph: nx.Graph | None = None
+        self._pos: dict[VectorIJ, tuple[int, int]] | None = None
+        # The coordinates live in self._arrays; vertex IDs are only created
+        # for the vertices that are looked at:
+        self._index_grid, self._index_grid_origin = _create_index_grid(self._arrays)
+        self._nodes: list[VectorIJ] | None = None
+        self._dq_coords: frozenset[VectorIJ] | None = None
+        self._aq_neighbors_of_dq: dict[VectorIJ, dict[AncillaType, list[VectorIJ]]] = {}
+        self._csr = _create_csr(self._arrays)
+        self._x_matching = None
+        self._x_check_indices: tuple[np.ndarray, np.ndarray] | None = None
+        self._corner_flip_table = {
+            self.node_at(k): (None if dq is None else self.node_at(dq))
+            for k, dq in _create_corner_flip_table(
+                self._arrays, self.size_ij, self.origin_ij
+            ).items()
+        }
         self._highlighted_vertices: Set[VectorIJ] = set(highlighted_vertices or [])
         self._flipped_ancillae: Set[VectorIJ] = set(flipped_ancillae or [])
         self.minimum_data_qbit_coordinate = VectorIJ(
@@ -287,9 +549,9 @@ class Surface:
         Create a deep copy of the Surface object.
         """
         surface = Surface(self.size_ij, self.origin_ij)
-        surface.graph = self.graph.copy()
         surface._highlighted_vertices = self._highlighted_vertices.copy()
         surface._flipped_ancillae = self._flipped_ancillae.copy()
+        surface._invalidate_flips()
         return surface
 
     def highlight_vertices(self, vertices: list[VectorIJ] | VectorIJ) -> None:
@@ -324,12 +586,14 @@ class Surface:
             is_flipped = ancilla_id not in self._flipped_ancillae
         if is_flipped:
             self._flipped_ancillae.add(ancilla_id)
+            self._invalidate_flips()
 
     def unflip_ancilla(self, ancilla_id: VectorIJ) -> None:
         """
         Unflip the ancilla qubit at the given location.
         """
         self._flipped_ancillae.discard(ancilla_id)
+        self._invalidate_flips()
 
     def is_flipped(self, ancilla_id: VectorIJ) -> bool:
         """
@@ -342,6 +606,7 @@ class Surface:
         Clear all flipped ancillae.
         """
         self._flipped_ancillae.clear()
+        self._invalidate_flips()
 
     def get_flipped_ancillae(self) -> list[VectorIJ]:
         """
@@ -349,16 +614,202 @@ class Surface:
         """
         return list(self._flipped_ancillae)
 
+    def iter_flipped_ancillae(self) -> Iterable[VectorIJ]:
+        """
+        Iterate over the flipped ancillae without copying them.
+
+        The Surface must not be flipped or unflipped during the iteration.
+        """
+        return iter(self._flipped_ancillae)
+
+    @cached_property
+    def flipped_ancillae_tuple(self) -> tuple[VectorIJ, ...]:
+        """
+        The flipped ancillae, as a tuple that is kept until the flips change.
+        """
+        return tuple(self._flipped_ancillae)
+
+    def _invalidate_flips(self) -> None:
+        self.__dict__.pop("flipped_ancillae_tuple", None)
+
     def get_ancilla_type(self, coord: VectorIJ) -> AncillaType:
         """
         Get the ancilla type for the given coordinate.
 
         """
-        return self.graph.nodes[coord]["ancilla_type"]
+        k = self.node_index(coord)
+        if self._arrays.node_type[k] != _NODE_ANCILLA:
+            raise KeyError(f"{coord} is not an ancilla qubit.")
+        return _ANCILLA_TYPES[self._arrays.ancilla_type[k]]
+
+    @property
+    def graph(self) -> nx.Graph:
+        """
+        A NetworkX view of the Surface, built the first time it is used.
+
+        Solving works directly on the Surface's arrays; the graph is kept for
+        drawing and for callers that want to inspect the surface with NetworkX.
+        """
+        if self._graph is None:
+            self._graph = _create_surface_graph(self._arrays, self._get_nodes())
+        return self._graph
 
     def get_graph(self) -> nx.Graph:
         return self.graph
 
+    def get_arrays(self) -> SurfaceArrays:
+        """
+        Get the struct-of-arrays layout of the Surface.
+
+        Vertex k of the arrays is the qubit at node_at(k).
+
+        """
+        return self._arrays
+
+    def get_data_qubits(self) -> frozenset[VectorIJ]:
+        """
+        Get the set of data qubit coordinates.
+
+        """
+        if self._dq_coords is None:
+            self._dq_coords = frozenset(
+                self.node_at(k)
+                for k in np.flatnonzero(self._arrays.node_type == _NODE_DATA).tolist()
+            )
+        return self._dq_coords
+
+    def get_aq_neighbors(self, dq: VectorIJ) -> dict[AncillaType, list[VectorIJ]]:
+        """
+        Get the AQ neighbors of the given DQ, grouped by ancilla type.
+
+        """
+        if dq not in self._aq_neighbors_of_dq:
+            k = self.node_index(dq)
+            if self._arrays.node_type[k] != _NODE_DATA:
+                raise KeyError(f"{dq} is not a data qubit.")
+            self._aq_neighbors_of_dq[dq] = {
+                ancilla_type: [self.node_at(n) for n in neighbors]
+                for ancilla_type, neighbors in _group_aq_neighbors(
+                    self._arrays, k
+                ).items()
+            }
+        return self._aq_neighbors_of_dq[dq]
+
+    def get_corner_flips(self) -> dict[VectorIJ, VectorIJ | None]:
+        """
+        Get the DQ to flip for each corner AQ, if it is the only flipped AQ.
+
+        Corner AQs with no unambiguous DQ to flip are mapped to None.
+
+        """
+        return self._corner_flip_table
+
+    def is_dq(self, coord: VectorIJ) -> bool:
+        """
+        Return whether there is a data qubit at the given coordinate.
+
+        """
+        try:
+            k = self.node_index(coord)
+        except KeyError:
+            return False
+        return bool(self._arrays.node_type[k] == _NODE_DATA)
+
+    def node_index(self, coord: VectorIJ) -> int:
+        """
+        Get the vertex number of the given coordinate.
+
+        This is also its column in shortest_path_lengths rows.
+
+        """
+        i = coord[0] - self._index_grid_origin.i
+        j = coord[1] - self._index_grid_origin.j
+        if 0 <= i < self._index_grid.shape[0] and 0 <= j < self._index_grid.shape[1]:
+            k = int(self._index_grid[i, j])
+            if k >= 0:
+                return k
+        raise KeyError(coord)
+
+    def node_at(self, k: int) -> VectorIJ:
+        """
+        Get the coordinate of the given vertex number.
+
+        """
+        return VectorIJ(int(self._arrays.coords_i[k]), int(self._arrays.coords_j[k]))
+
+    def _get_nodes(self) -> list[VectorIJ]:
+        """
+        Get the coordinates of all vertices, in vertex order.
+
+        """
+        if self._nodes is None:
+            self._nodes = [
+                VectorIJ(i, j)
+                for i, j in zip(
+                    self._arrays.coords_i.tolist(), self._arrays.coords_j.tolist()
+                )
+            ]
+        return self._nodes
+
+    def get_x_matching(self):
+        """
+        Get a PyMatching decoder for flips of the Surface's X AQs.
+
+        Each DQ is a possible error that flips the X AQs next to it. The
+        syndrome bits are the X AQs and the correction bits are the DQs, as
+        numbered by get_x_check_indices. The decoder is built the first time it
+        is used.
+
+        """
+        if pymatching is None:
+            raise ImportError(
+                "The pymatching backend requires PyMatching: "
+                "pip install squec[pymatching]"
+            )
+        if self._x_matching is None:
+            self._x_matching = pymatching.Matching.from_check_matrix(
+                _create_x_check_matrix(self._arrays, *self.get_x_check_indices())
+            )
+        return self._x_matching
+
+    def get_x_check_indices(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the vertex numbers of the X AQs and of the DQs, in node_index order.
+
+        These are the vertices behind the syndrome bits and the correction bits
+        of get_x_matching's decoder, by position.
+
+        """
+        if self._x_check_indices is None:
+            self._x_check_indices = _create_x_check_indices(self._arrays)
+        return self._x_check_indices
+
+    def shortest_path_lengths(self, source_coords: list[VectorIJ]) -> np.ndarray:
+        """
+        Get the weighted distance from each source to every vertex.
+
+        Returns one row per source, indexed by node_index. Large surfaces run
+        the search on the GPU through nx-cugraph if it is installed; otherwise
+        it runs in SciPy's compiled Dijkstra if SciPy is installed, or in
+        NetworkX.
+
+        """
+        if not source_coords:
+            return np.zeros((0, len(self._arrays)))
+        use_gpu = _HAS_CUGRAPH and len(self._arrays) >= _GPU_MIN_NODES
+        if self._csr is not None and not use_gpu:
+            return dijkstra(
+                self._csr, indices=[self.node_index(c) for c in source_coords]
+            )
+        backend = {"backend": "cugraph"} if use_gpu else {}
+        rows = []
+        for source in source_coords:
+            lengths = nx.single_source_dijkstra_path_length(
+                self.graph, source, weight="weight", **backend
+            )
+            rows.append([lengths.get(node, math.inf) for node in self._get_nodes()])
+        return np.array(rows)
+
     def draw(
         self,
         highlighted_vertices: list[VectorIJ] | None = None,
@@ -369,111 +820,59 @@ class Surface:
         """
         draw_kwargs = draw_kwargs or {}
         g = self.graph
-        highlighted_vertices = (
+        highlighted = set(
             highlighted_vertices or list(self._highlighted_vertices) or []
         )
-        pos = {node: (node.i, node.j) for node in g.nodes()}
+        if self._pos is None:
+            self._pos = {node: (node.i, node.j) for node in self._get_nodes()}
+        pos = self._pos
         nx.draw_networkx_edges(g, pos=pos, **draw_kwargs)
-        # Several calls to draw data nodes:
-        node_color = [
-            (
-                _DQ_COLOR
-                if g.nodes[node]["qubit_type"] == QubitType.DATA
-                else (
-                    _X_COLOR
-                    if g.nodes[node]["ancilla_type"] == AncillaType.X
-                    else _Z_COLOR
-                )
-            )
-            for node in g.nodes()
-        ]
 
-        # Draw highlighted data nodes:
-        nx.draw_networkx_nodes(
-            g,
-            pos=pos,
-            node_color=_HIGHLIGHT_COLOR,  # type: ignore
-            node_size=[  # type: ignore
-                (
-                    0
-                    if g.nodes[node]["qubit_type"] == QubitType.ANCILLA
-                    else (500 * _HIGHLIGHT_SIZE if node in highlighted_vertices else 0)
-                )
-                for node in g.nodes()
-            ],
-            **draw_kwargs,
-        )
-        # Draw flipped data nodes:
-        nx.draw_networkx_nodes(
-            g,
-            pos=pos,
-            node_color=_FLIP_COLOR,  # type: ignore
-            node_size=[  # type: ignore
-                (
-                    0
-                    if g.nodes[node]["qubit_type"] == QubitType.ANCILLA
-                    else (500 * _FLIP_SIZE if node in self._flipped_ancillae else 0)
-                )
-                for node in g.nodes()
-            ],
-            **draw_kwargs,
-        )
-        # Draw all other data nodes:
-        nx.draw_networkx_nodes(
-            g,
-            pos=pos,
-            node_color=node_color,  # type: ignore
-            node_size=[  # type: ignore
-                500 if g.nodes[node]["qubit_type"] == QubitType.DATA else 0
-                for node in g.nodes()
-            ],
-            **draw_kwargs,
-        )
+        # Sort the nodes into the layers they are drawn in, in one pass:
+        dq_nodes, aq_nodes, aq_colors = [], [], []
+        highlighted_dqs: list[VectorIJ] = []
+        highlighted_aqs: list[VectorIJ] = []
+        flipped_dqs: list[VectorIJ] = []
+        flipped_aqs: list[VectorIJ] = []
+        for node, node_type, ancilla_type in zip(
+            self._get_nodes(),
+            self._arrays.node_type.tolist(),
+            self._arrays.ancilla_type.tolist(),
+        ):
+            if node_type == _NODE_DATA:
+                dq_nodes.append(node)
+                highlighted_layer, flipped_layer = highlighted_dqs, flipped_dqs
+            else:
+                aq_nodes.append(node)
+                aq_colors.append(_X_COLOR if ancilla_type == _ANCILLA_X else _Z_COLOR)
+                highlighted_layer, flipped_layer = highlighted_aqs, flipped_aqs
+            if node in highlighted:
+                highlighted_layer.append(node)
+            if node in self._flipped_ancillae:
+                flipped_layer.append(node)
+
+        # Each layer is drawn over the ones before it, so the highlighted and
+        # flipped nodes show as a ring around the node itself:
+        for nodelist, node_color, node_size, node_shape in [
+            (highlighted_dqs, _HIGHLIGHT_COLOR, 500 * _HIGHLIGHT_SIZE, "o"),
+            (flipped_dqs, _FLIP_COLOR, 500 * _FLIP_SIZE, "o"),
+            (dq_nodes, _DQ_COLOR, 500, "o"),
+            (highlighted_aqs, _HIGHLIGHT_COLOR, 2000 * _HIGHLIGHT_SIZE, "s"),
+            (flipped_aqs, _FLIP_COLOR, 2000 * _FLIP_SIZE, "s"),
+            (aq_nodes, aq_colors, 2000, "s"),
+        ]:
+            if not nodelist:
+                continue
+            nx.draw_networkx_nodes(
+                g,
+                pos=pos,
+                nodelist=nodelist,
+                node_color=node_color,  # type: ignore
+                node_size=node_size,
+                node_shape=node_shape,
+                **draw_kwargs,
+            )
 
-        # Draw highlighted ancilla nodes:
-        nx.draw_networkx_nodes(
-            g,
-            pos=pos,
-            node_color=_HIGHLIGHT_COLOR,  # type: ignore
-            node_size=[  # type: ignore
-                (
-                    0
-                    if g.nodes[node]["qubit_type"] == QubitType.DATA
-                    else (2000 * _HIGHLIGHT_SIZE if node in highlighted_vertices else 0)
-                )
-                for node in g.nodes()
-            ],
-            node_shape="s",
-            **draw_kwargs,
-        )
-        # Draw flipped ancilla nodes:
-        nx.draw_networkx_nodes(
-            g,
-            pos=pos,
-            node_color=_FLIP_COLOR,  # type: ignore
-            node_size=[  # type: ignore
-                (
-                    0
-                    if g.nodes[node]["qubit_type"] == QubitType.DATA
-                    else (2000 * _FLIP_SIZE if node in self._flipped_ancillae else 0)
-                )
-                for node in g.nodes()
-            ],
-            node_shape="s",
-            **draw_kwargs,
-        )
-        # Draw ancilla nodes:
-        nx.draw_networkx_nodes(
-            g,
-            pos=pos,
-            node_color=node_color,  # type: ignore
-            node_size=[  # type: ignore
-                0 if g.nodes[node]["qubit_type"] == QubitType.DATA else 2000
-                for node in g.nodes()
-            ],
-            node_shape="s",
-            **draw_kwargs,
-        )
         # Draw labels:
         nx.draw_networkx_labels(
             g,
@@ -1,5 +1,8 @@
 import unittest
-from squec import squec_solve, Surface, VectorIJ
+
+import networkx as nx
+
+from squec import squec_solve, get_metagraph, Surface, VectorIJ, AncillaType
 
 
 def _is_symmetric_to_solution(
@@ -8,6 +11,17 @@ def _is_symmetric_to_solution(
     return set(solve) == set(dq_list)
 
 
+def _is_minimum_correction(solve: list[VectorIJ], dq_count: int, surface: Surface):
+    # Flipping the DQs must clear every flipped AQ, and no others, with no
+    # more DQs than the known minimum:
+    flipped = set()
+    for dq in solve:
+        flipped ^= set(surface.get_aq_neighbors(dq)[AncillaType.X])
+    return len(set(solve)) == dq_count and flipped == set(
+        surface.get_flipped_ancillae()
+    )
+
+
 class TestSampleProblemsForJordan(unittest.TestCase):
 
     def test_4_interior_dq_errors_A(self):
@@ -31,14 +45,9 @@ class TestSampleProblemsForJordan(unittest.TestCase):
         s.flip_ancilla(VectorIJ(14, 10))
         s.flip_ancilla(VectorIJ(14, 6))
         solve = squec_solve(s)
-        self.assertTrue(
-            _is_symmetric_to_solution(
-                [VectorIJ(15, 9), VectorIJ(9, 7), VectorIJ(11, 7), VectorIJ(13, 7)],
-                solve,
-                s,
-            ),
-            solve,
-        )
+        # There are several equally short corrections, such as (15, 9), (9, 7),
+        # (11, 7), (13, 7), and any of them is valid:
+        self.assertTrue(_is_minimum_correction(solve, 4, s), solve)
 
     def test_4_dq_t_pattern_B(self):
         s = Surface((23, 23))
@@ -110,3 +119,44 @@ class TestSampleProblemsForJordan(unittest.TestCase):
     #         ),
     #         solve,
     #     )
+
+
+class TestMetagraphDistances(unittest.TestCase):
+
+    def test_dq_counts_match_shortest_paths(self):
+        s = Surface((15, 15))
+        g = s.get_graph()
+        ancillae = [
+            node
+            for node, ancilla_type in g.nodes(data="ancilla_type")
+            if ancilla_type == AncillaType.X
+        ]
+        metagraph = get_metagraph(s, ancillae)
+        for u, v, data in metagraph.edges(data=True):
+            # Paths alternate weight-1 AQ-DQ hops and weight-2 DQ-DQ steps:
+            path_weight = nx.shortest_path_length(g, u, v, weight="weight")
+            expected = path_weight // 2 + 1 if data["is_to_edge"] else path_weight // 2
+            self.assertEqual(data["dq_count"], expected, (u, v))
+
+
+class TestPymatchingBackend(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import pymatching  # noqa: F401
+        except ImportError:
+            self.skipTest("PyMatching is not installed.")
+
+    def test_pymatching_flips_as_many_dqs_as_python(self):
+        s = Surface((23, 23))
+        s.flip_ancilla(VectorIJ(8, 8))
+        s.flip_ancilla(VectorIJ(16, 8))
+        s.flip_ancilla(VectorIJ(14, 10))
+        s.flip_ancilla(VectorIJ(14, 6))
+        solve = squec_solve(s, backend="pymatching")
+        self.assertEqual(len(solve), len(squec_solve(s)), solve)
+        # Flipping the DQs must clear every flipped AQ, and no others:
+        flipped = set()
+        for dq in solve:
+            flipped ^= set(s.get_aq_neighbors(dq)[AncillaType.X])
+        self.assertEqual(flipped, set(s.get_flipped_ancillae()))
@@ -0,0 +1,53 @@
+import networkx as nx
+import pytest
+
+from squec.pmss import partial_min_spanning_set, _solve_pairing
+
+
+def _as_edge_set(edges):
+    return {frozenset(edge) for edge in edges}
+
+
+def test_pmss_prefers_cheapest_pairing():
+    host = nx.Graph()
+    host.add_edge(1, 4, weight=2)
+    host.add_edge(1, 2, weight=100)
+    host.add_edge(2, 3, weight=100)
+    host.add_edge(3, 4, weight=100)
+    assert _as_edge_set(partial_min_spanning_set(host, [1, 2, 3, 4])) == {
+        frozenset((1, 4)),
+        frozenset((2, 3)),
+    }
+
+
+def test_pmss_required_vertices_can_share_ground():
+    host = nx.Graph()
+    host.add_edge(1, 2, weight=1000)
+    host.add_edge(1, 3, weight=1)
+    assert _as_edge_set(partial_min_spanning_set(host, [3, 2])) == {
+        frozenset((1, 2)),
+        frozenset((1, 3)),
+    }
+
+
+def test_pmss_uses_ground_only_when_cheaper():
+    host = nx.Graph()
+    host.add_edge("a", "b", weight=3)
+    host.add_edge("a", "ground", weight=2)
+    host.add_edge("b", "ground", weight=2)
+    assert _as_edge_set(partial_min_spanning_set(host, ["a", "b"])) == {
+        frozenset(("a", "b"))
+    }
+
+
+def test_pmss_raises_when_no_spanning_set_exists():
+    host = nx.Graph()
+    host.add_edge(1, 2, weight=1)
+    host.add_node(3)
+    with pytest.raises(ValueError):
+        partial_min_spanning_set(host, [1, 2, 3])
+
+
+def test_solve_pairing_on_dense_costs():
+    pair_costs = [[0, 1, 50], [1, 0, 50], [50, 50, 0]]
+    assert sorted(_solve_pairing(pair_costs, [5, 5, 2]), key=str) == [(0, 1), (2, None)]
@@ -1,4 +1,4 @@
-from squec.surface import Surface, VectorIJ
+from squec.surface import AncillaType, Surface, VectorIJ
 
 
 def test_can_create_surface_with_tuple():
@@ -19,3 +19,34 @@ def test_can_create_surface_with_tuple_and_origin():
 #     assert surface.size_ij.j == 3
 #     assert len(surface.graph.nodes) == 6
 #     assert len(surface.graph.edges) == 7
+
+
+def test_surface_data_qubits_are_odd_coordinates():
+    surface = Surface((7, 7))
+    assert surface.is_dq(VectorIJ(1, 1))
+    assert not surface.is_dq(VectorIJ(2, 2))
+    assert all(dq.i % 2 == 1 and dq.j % 2 == 1 for dq in surface.get_data_qubits())
+
+
+def test_surface_corner_flips_are_boundary_dqs():
+    surface = Surface((7, 7))
+    corner_flips = surface.get_corner_flips()
+    assert corner_flips[VectorIJ(2, 0)] == VectorIJ(1, 1)
+    assert VectorIJ(2, 2) not in corner_flips
+
+
+def test_surface_groups_aq_neighbors_by_type():
+    surface = Surface((7, 7))
+    assert surface.get_aq_neighbors(VectorIJ(1, 1)) == {
+        AncillaType.X: [VectorIJ(2, 2)],
+        AncillaType.Z: [VectorIJ(2, 0)],
+    }
+
+
+def test_surface_flipped_ancillae_tuple_follows_flips():
+    surface = Surface((7, 7))
+    surface.flip_ancilla(VectorIJ(2, 2))
+    assert surface.flipped_ancillae_tuple == (VectorIJ(2, 2),)
+    assert surface.flipped_ancillae_tuple is surface.flipped_ancillae_tuple
+    surface.unflip_ancilla(VectorIJ(2, 2))
+    assert surface.flipped_ancillae_tuple == ()
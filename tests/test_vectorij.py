@@ -1,5 +1,14 @@
+import numpy as np
+import pytest
+
+from squec._vector import _ZERO_VEC
 from squec.surface import VectorIJ
 
+# Expected results, shared by the asserts below:
+_V46 = VectorIJ(4, 6)
+_VN2N2 = VectorIJ(-2, -2)
+_VN9999N2 = VectorIJ(-9999, -2)
+
 
 def test_vectorij_equality():
     a = VectorIJ(1, 2)
@@ -16,28 +25,75 @@ def test_vectorij_clone():
 def test_vectorij_separation():
     start = VectorIJ(1, 2)
     end = VectorIJ(3, 4)
-    assert (start - end) == VectorIJ(-2, -2)
+    assert (start - end) == _VN2N2
     start = VectorIJ(1, 2)
     end = VectorIJ(3, 4)
-    assert (start.separation_from(end)) == VectorIJ(-2, -2)
+    assert (start.separation_from(end)) == _VN2N2
     start = VectorIJ(1, 2)
     end = VectorIJ(10000, 4)
-    assert (VectorIJ.separation(start, end)) == VectorIJ(-9999, -2)
+    assert (VectorIJ.separation(start, end)) == _VN9999N2
 
 
 def test_add_with_vectorij():
     start = VectorIJ(1, 2)
     end = VectorIJ(3, 4)
-    assert (start + end) == VectorIJ(4, 6)
+    assert (start + end) == _V46
 
 
 def test_add_with_tuple():
     start = VectorIJ(1, 2)
     end = (3, 4)
-    assert (start + end) == VectorIJ(4, 6)
+    assert (start + end) == _V46
 
 
 def test_add_with_list():
     start = VectorIJ(1, 2)
     end = [3, 4]
-    assert (start + end) == VectorIJ(4, 6)
+    assert (start + end) == _V46
+
+
+def test_vectorij_hash_matches_tuple():
+    a = VectorIJ(1, 2)
+    assert hash(a) == hash((1, 2))
+    assert {a: True}[(1, 2)]
+
+
+def test_add_to_tuple():
+    assert ((3, 4) + VectorIJ(1, 2)) == _V46
+
+
+def test_vectorij_is_shared():
+    assert VectorIJ(1, 2) is VectorIJ((1, 2))
+
+
+def test_vectorij_separation_from_itself():
+    a = VectorIJ(10000, 4)
+    assert a.separation_from(a) is _ZERO_VEC
+
+
+def test_vectorij_separation_rejects_non_vectors():
+    with pytest.raises(ValueError):
+        VectorIJ(1, 2).separation_from(5)
+    with pytest.raises(ValueError):
+        VectorIJ.separation(VectorIJ(1, 2), None)
+
+
+def test_vectorij_difference_is_vectorij():
+    difference = VectorIJ(10, 8) - VectorIJ(5, 5)
+    assert difference.i == 5
+    assert difference - (2, 1) == (3, 2)
+    assert difference + (1, 2) == (6, 5)
+
+
+def test_vectorij_separation_from_is_vectorij():
+    assert VectorIJ(1, 2).separation_from(VectorIJ(3, 4)).i == -2
+
+
+def test_vectorij_is_not_shared_across_types():
+    VectorIJ(1, 2)
+    assert type(VectorIJ(1.0, 2.0).i) is float
+    assert type(VectorIJ(True, 2).i) is bool
+
+
+def test_vectorij_accepts_numpy_ints():
+    assert VectorIJ(np.int64(1), np.int64(2)) == (1, 2)